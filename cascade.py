@@ -0,0 +1,243 @@
+"""Cheap local triage in front of the remote model.
+
+A hashed bag-of-words linear model scores each transcript for possible_death
+and false_alarm. It is trained on the remote model's past answers, which the
+server appends to a JSON-lines file. Only confident calls are answered
+locally; everything in the uncertain band still goes to the remote model.
+
+The thresholds follow the safety rules in the system prompt: a call is only
+resolved as "no death risk" when the model is nearly certain, it mentions none
+of the death-risk terms below and it looks like a false alarm. A confident
+death prediction is resolved locally as possible_death = 1, so the local path
+can upgrade a call but never downgrade one.
+"""
+import collections
+import json
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+# Calls containing a word that starts with any of these always go to the remote
+# model unless the local model is confident they are critical. Stems are matched
+# as word prefixes so "died", "stabbed" and "can't breathe" count too;
+# over-matching only costs a remote call.
+DEATH_RISK_STEMS = (
+    "dead", "death", "die", "dying", "breath", "unconscious", "unresponsive",
+    "pass out", "passed out", "faint", "collaps", "wake", "not moving", "blood",
+    "bleed", "shot", "shoot", "gun", "firearm", "weapon", "stab", "knife", "cut",
+    "overdos", "pills", "poison", "heart", "cardiac", "stroke", "seizur", "chok",
+    "fire", "burn", "smoke", "hang(?!\\s*up)", "suicid", "kill", "murder", "drown",
+    "cpr", "pulse", "blue", "crash", "hit by", "fell", "fall",
+)
+DEATH_RISK_PATTERN = re.compile(r"\b(?:" + "|".join(DEATH_RISK_STEMS) + ")")
+
+
+def mentions_death_risk(text):
+    return DEATH_RISK_PATTERN.search(text.lower()) is not None
+
+
+def hash_features(text, dim):
+    """Return (indices, values) of the L2-normalized hashed unigram and bigram counts."""
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    if not grams:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+    hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.int64, count=len(grams))
+    indices, counts = np.unique(hashes % dim, return_counts=True)
+    values = np.log1p(counts).astype(np.float32)
+    values /= np.linalg.norm(values)
+    return indices, values
+
+
+def sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+class HashedLinearModel:
+    """Two logistic heads over hashed features: P(possible_death) and false_alarm / 100."""
+
+    def __init__(self, dim):
+        self.dim = dim
+        self.weights = np.zeros((dim, 2), dtype=np.float32)
+        self.bias = np.zeros(2, dtype=np.float32)
+
+    def fit(self, features, death, false_alarm, epochs=30, batch_size=256, learning_rate=10.0, l2=1e-4):
+        n = len(features)
+        targets = np.stack([death, false_alarm], axis=1).astype(np.float32)
+
+        # Weight deaths up so the local model errs towards flagging them
+        positives = max(float(death.sum()), 1.0)
+        sample_weight = np.ones((n, 2), dtype=np.float32)
+        sample_weight[:, 0] = np.where(death > 0, (n - positives) / positives, 1.0)
+
+        rng = np.random.default_rng(0)
+        for _ in range(epochs):
+            order = rng.permutation(n)
+            for start in range(0, n, batch_size):
+                batch = order[start:start + batch_size]
+                x = np.zeros((len(batch), self.dim), dtype=np.float32)
+                for row, i in enumerate(batch):
+                    indices, values = features[i]
+                    x[row, indices] = values
+                error = (sigmoid(x @ self.weights + self.bias) - targets[batch]) * sample_weight[batch]
+                self.weights -= learning_rate * (x.T @ error / len(batch) + l2 * self.weights)
+                self.bias -= learning_rate * error.mean(axis=0)
+        return self
+
+    def predict(self, indices, values):
+        death_prob, false_alarm = sigmoid(values @ self.weights[indices] + self.bias)
+        return float(death_prob), float(false_alarm) * 100.0
+
+
+class Cascade:
+    """Answers confident transcripts locally and records remote answers for training."""
+
+    def __init__(self, path, death_high=0.9, death_low=0.02, false_alarm_high=80.0,
+                 dim=1 << 14, min_samples=200, min_class_samples=20, retrain_every=50,
+                 max_samples=20000):
+        if not 0.0 <= death_low < death_high <= 1.0:
+            raise ValueError("Cascade thresholds need 0 <= death_low < death_high <= 1")
+        self.path = path
+        self.death_high = death_high
+        self.death_low = death_low
+        self.false_alarm_high = false_alarm_high
+        self.dim = dim
+        self.min_samples = min_samples
+        self.min_class_samples = min_class_samples
+        self.retrain_every = retrain_every
+
+        self.samples = collections.deque(maxlen=max_samples)
+        self.samples_lock = threading.Lock()
+        self.train_lock = threading.Lock()
+        self.since_training = 0
+        self.model = None
+
+        self.stats_lock = threading.Lock()
+        self.local_count = 0
+        self.escalated_count = 0
+        self.local_seconds = 0.0
+        self.remote_count = 0
+        self.remote_seconds = 0.0
+
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    sample = json.loads(line)
+                    self.samples.append((sample["transcript"], float(sample["possible_death"]), float(sample["false_alarm"])))
+                    if "remote_ms" in sample:
+                        self.remote_count += 1
+                        self.remote_seconds += sample["remote_ms"] / 1000.0
+                except (ValueError, KeyError, TypeError):
+                    continue
+        self.train_in_background()
+
+    # Training takes seconds on a full sample set, so it never runs on a caller's thread
+    def train_in_background(self):
+        threading.Thread(target=self.train, name="cascade-training", daemon=True).start()
+
+    def train(self):
+        # Only one retrain at a time; callers that lose the race just skip it
+        if not self.train_lock.acquire(blocking=False):
+            return
+        try:
+            with self.samples_lock:
+                samples = list(self.samples)
+                self.since_training = 0
+            death = np.array([1.0 if pd > 0 else 0.0 for _, pd, _ in samples], dtype=np.float32)
+            positives = int(death.sum())
+            if len(samples) < self.min_samples or min(positives, len(samples) - positives) < self.min_class_samples:
+                return
+
+            features = [hash_features(transcript, self.dim) for transcript, _, _ in samples]
+            false_alarm = np.clip(np.array([fa for _, _, fa in samples], dtype=np.float32) / 100.0, 0.0, 1.0)
+            self.model = HashedLinearModel(self.dim).fit(features, death, false_alarm)
+            print(f"🧮 Cascade model trained on {len(samples)} past LLM outputs")
+        finally:
+            self.train_lock.release()
+
+    def record(self, transcript, response, remote_seconds):
+        """Store a remote model answer as a training sample."""
+        with self.stats_lock:
+            self.remote_count += 1
+            self.remote_seconds += remote_seconds
+        try:
+            sample = (transcript, float(response["possible_death"]), float(response["false_alarm"]))
+        except (KeyError, TypeError, ValueError):
+            return
+
+        with self.samples_lock:
+            self.samples.append(sample)
+            self.since_training += 1
+            retrain = self.since_training >= self.retrain_every
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"transcript": sample[0], "possible_death": sample[1],
+                                    "false_alarm": sample[2], "remote_ms": round(remote_seconds * 1000, 3),
+                                    "timestamp": time.time()}) + "\n")
+        if retrain:
+            self.train_in_background()
+
+    def triage(self, transcript):
+        """Return a local LLM-style output, or None if the call must escalate."""
+        started = time.perf_counter()
+        model = self.model
+        indices, values = hash_features(transcript, self.dim)
+        result = None
+        if model is not None and len(indices):
+            death_prob, false_alarm = model.predict(indices, values)
+            if death_prob >= self.death_high:
+                # Keep the false alarm score low so a critical call is never shown as one
+                result = self.local_output(transcript, 1, min(false_alarm, 100.0 - self.false_alarm_high), "likely critical")
+            elif death_prob <= self.death_low and false_alarm >= self.false_alarm_high:
+                if not mentions_death_risk(transcript):
+                    result = self.local_output(transcript, 0, false_alarm, "likely false alarm")
+
+        with self.stats_lock:
+            if result is None:
+                self.escalated_count += 1
+            else:
+                self.local_count += 1
+                self.local_seconds += time.perf_counter() - started
+        return result
+
+    def local_output(self, transcript, possible_death, false_alarm, verdict):
+        lines = [line.strip() for line in transcript.splitlines() if line.strip()]
+        excerpt = lines[-1][:200] if lines else ""
+        return {
+            "response": {
+                "possible_death": possible_death,
+                "false_alarm": round(false_alarm),
+                "location": "Unknown",
+                "description": f"Auto-triaged as {verdict}. Last message: {excerpt}"
+            }
+        }
+
+    def stats(self):
+        with self.stats_lock:
+            total = self.local_count + self.escalated_count
+            mean_remote_ms = self.remote_seconds / self.remote_count * 1000 if self.remote_count else None
+            mean_local_ms = self.local_seconds / self.local_count * 1000 if self.local_count else None
+            saved_ms = None
+            if mean_remote_ms is not None:
+                saved_ms = self.local_count * (mean_remote_ms - (mean_local_ms or 0.0))
+            return {
+                "trained": self.model is not None,
+                "training_samples": len(self.samples),
+                "local": self.local_count,
+                "escalated": self.escalated_count,
+                "escalation_rate": self.escalated_count / total if total else None,
+                "mean_remote_ms": mean_remote_ms,
+                "mean_local_ms": mean_local_ms,
+                "latency_saved_ms": saved_ms,
+            }
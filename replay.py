@@ -0,0 +1,309 @@
+"""Replay captured /messages and /api/alerts traffic against the alert server.
+
+Record a workload by running the server with FLORIAN_CAPTURE set:
+
+    FLORIAN_CAPTURE=capture.jsonl.gz python server.py
+
+Then replay it at 1x, 10x or 100x speed:
+
+    python replay.py capture.jsonl.gz --speed 10
+
+By default a fresh server is started on a free port with the stub model
+backend (FLORIAN_LLM_BACKEND=stub), so runs are repeatable and never call the
+remote model. Pass --url to drive a server that is already running instead;
+it must also run with FLORIAN_LLM_BACKEND=stub, because alerts are matched by a
+"replay-id N" tag that only the stub backend copies into the description.
+"""
+import argparse
+import base64
+import gzip
+import json
+import math
+import os
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_CONTENT_TYPES = ("application/msgpack", "application/x-msgpack")
+REPLAY_TAG = "replay-id"
+REPLAY_TAG_PATTERN = re.compile(REPLAY_TAG + r" (\d+)")
+
+
+def load_capture(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        records = []
+        try:
+            for line in f:
+                if line.strip():
+                    records.append(json.loads(line))
+        except EOFError:
+            # The server was killed before closing the capture; every record is
+            # flushed as it is written, so what we have read so far is complete
+            pass
+    return header, records
+
+
+def record_body(record):
+    if record.get("body_b64") is not None:
+        return base64.b64decode(record["body_b64"])
+    if record.get("body") is not None:
+        return record["body"].encode("utf-8")
+    return None
+
+
+def decode_body(record, body):
+    if record.get("content_encoding") == "gzip":
+        body = gzip.decompress(body)
+    if (record.get("content_type") or "").startswith(MSGPACK_CONTENT_TYPES):
+        return msgpack.unpackb(body, raw=False)
+    return json.loads(body)
+
+
+def encode_body(record, payload):
+    if (record.get("content_type") or "").startswith(MSGPACK_CONTENT_TYPES):
+        body = msgpack.packb(payload)
+    else:
+        body = json.dumps(payload).encode("utf-8")
+    if record.get("content_encoding") == "gzip":
+        body = gzip.compress(body)
+    return body
+
+
+# Tag a request so the alert it produces can be found in GET /api/alerts.
+# Returns the rewritten body, or None if the request creates no alert.
+def tag_request(record, body, seq):
+    if record["method"] != "POST" or not body:
+        return None
+    if record.get("content_encoding") not in (None, "identity", "gzip"):
+        return None
+    if (record.get("content_type") or "").startswith(MSGPACK_CONTENT_TYPES) and msgpack is None:
+        return None
+
+    payload = decode_body(record, body)
+    tag = f"{REPLAY_TAG} {seq}"
+    entry = {"type": "user_message", "message": {"role": "user", "content": tag}}
+    if record["path"] == "/messages" and isinstance(payload, list):
+        payload.append(entry)
+    elif record["path"] == "/messages" and isinstance(payload, dict):
+        # Delta bodies: the tag entry lengthens the session, so recorded
+        # offsets no longer line up and are dropped
+        payload.setdefault("messages", []).append(entry)
+        payload.pop("offset", None)
+    elif record["path"] == "/api/alerts" and isinstance(payload, dict):
+        target = payload.get("response", payload)
+        target["description"] = f"{target.get('description') or ''} {tag}".strip()
+    else:
+        return None
+    return encode_body(record, payload)
+
+
+def send(url, record, body):
+    headers = {}
+    if record.get("content_type"):
+        headers["Content-Type"] = record["content_type"]
+    if record.get("content_encoding"):
+        headers["Content-Encoding"] = record["content_encoding"]
+    req = urllib.request.Request(url + record["path"], data=body, headers=headers, method=record["method"])
+    try:
+        with urllib.request.urlopen(req) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# The replay server must neither record the replay nor feed stub answers into
+# the cascade's training file
+def stub_server_env(stub_latency_ms):
+    env = dict(os.environ, FLORIAN_LLM_BACKEND="stub", FLORIAN_STUB_LATENCY_MS=str(stub_latency_ms))
+    env.pop("FLORIAN_CAPTURE", None)
+    env.pop("FLORIAN_CASCADE_DATA", None)
+    return env
+
+
+def start_stub_server(stub_latency_ms):
+    port = free_port()
+    env = stub_server_env(stub_latency_ms)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "flask", "--app", "server", "run", "--port", str(port)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url + "/api/alerts").read()
+            return proc, url
+        except OSError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("Stub server did not start within 30 seconds")
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return float("nan")
+    rank = math.ceil(pct / 100.0 * len(sorted_values)) - 1
+    return sorted_values[max(0, min(rank, len(sorted_values) - 1))]
+
+
+def replay(url, records, speed, poll_interval, timeout, workers):
+    pending = {}
+    latencies = []
+    lock = threading.Lock()
+    sending_done = threading.Event()
+    drain_deadline = [float("inf")]
+    polling = {"polls": 0, "seconds": 0.0, "bytes": 0}
+
+    # Single poller: resolves pending requests as their alerts become visible.
+    # Alerts are listed newest first, so asking for a few more than are
+    # outstanding finds them without fetching the whole store on every poll.
+    def poll():
+        while True:
+            with lock:
+                if sending_done.is_set() and not pending:
+                    return
+                outstanding = len(pending)
+            if not outstanding:
+                time.sleep(poll_interval)
+                continue
+            poll_started = time.monotonic()
+            try:
+                with urllib.request.urlopen(f"{url}/api/alerts?limit={2 * outstanding + 32}") as response:
+                    body = response.read()
+                alerts = json.loads(body)
+            except OSError:
+                body, alerts = b"", []
+            seen_at = time.monotonic()
+            polling["polls"] += 1
+            polling["seconds"] += seen_at - poll_started
+            polling["bytes"] += len(body)
+            with lock:
+                for alert in alerts:
+                    match = REPLAY_TAG_PATTERN.search(alert.get("description") or "")
+                    if match:
+                        sent_at = pending.pop(int(match.group(1)), None)
+                        if sent_at is not None:
+                            latencies.append(seen_at - sent_at)
+            if sending_done.is_set() and time.monotonic() > drain_deadline[0]:
+                return
+            time.sleep(poll_interval)
+
+    def fire(seq, record):
+        body = record_body(record)
+        tagged = tag_request(record, body, seq)
+        sent_at = time.monotonic()
+        if tagged is not None:
+            body = tagged
+            with lock:
+                pending[seq] = sent_at
+        status = send(url, record, body)
+        if status >= 400 and tagged is not None:
+            with lock:
+                pending.pop(seq, None)
+        return status
+
+    poller = threading.Thread(target=poll, daemon=True)
+    poller.start()
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for seq, record in enumerate(records):
+            delay = started + record["t"] / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(pool.submit(fire, seq, record))
+        statuses = [future.result() for future in futures]
+    sent_elapsed = time.monotonic() - started
+
+    drain_deadline[0] = time.monotonic() + timeout
+    sending_done.set()
+    poller.join()
+    elapsed = time.monotonic() - started
+
+    with lock:
+        missing = len(pending)
+    return {
+        "requests": len(records),
+        "errors": sum(1 for status in statuses if status >= 400),
+        "alerts": len(latencies),
+        "missing": missing,
+        "send_seconds": sent_elapsed,
+        "elapsed_seconds": elapsed,
+        "latencies": sorted(latencies),
+        "polls": polling["polls"],
+        "poll_seconds": polling["seconds"],
+        "poll_bytes": polling["bytes"],
+    }
+
+
+def report(result, speed):
+    latencies = result["latencies"]
+    print(f"Replayed {result['requests']} requests at {speed:g}x in {result['send_seconds']:.2f}s "
+          f"({result['errors']} errors)")
+    print(f"Request throughput: {result['requests'] / max(result['send_seconds'], 1e-9):.1f} req/s")
+    print(f"Alert throughput:   {result['alerts'] / max(result['elapsed_seconds'], 1e-9):.1f} alerts/s "
+          f"({result['alerts']} visible, {result['missing']} never appeared)")
+    for pct in (50, 95, 99):
+        print(f"p{pct} receipt-to-visible latency: {percentile(latencies, pct) * 1000:.1f} ms")
+    polls = result["polls"]
+    print(f"Polling overhead: {polls} GET /api/alerts, {result['poll_bytes'] / 1024:.1f} KiB, "
+          f"{result['poll_seconds'] / max(polls, 1) * 1000:.2f} ms mean")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured alert server traffic")
+    parser.add_argument("capture", help="capture file written with FLORIAN_CAPTURE")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier, e.g. 1, 10 or 100")
+    parser.add_argument("--url", help="drive an already running server (started with FLORIAN_LLM_BACKEND=stub) instead of starting one")
+    parser.add_argument("--stub-latency-ms", type=float, default=0, help="simulated model latency for the stub backend")
+    parser.add_argument("--poll-interval", type=float, default=0.005, help="seconds between GET /api/alerts polls")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds to wait for outstanding alerts")
+    parser.add_argument("--workers", type=int, default=64, help="maximum concurrent requests")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args()
+
+    _, records = load_capture(args.capture)
+    proc = None
+    url = args.url
+    if url is None:
+        proc, url = start_stub_server(args.stub_latency_ms)
+    try:
+        result = replay(url.rstrip("/"), records, args.speed, args.poll_interval, args.timeout, args.workers)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    if args.json:
+        latencies = result.pop("latencies")
+        result.update({f"p{pct}_ms": percentile(latencies, pct) * 1000 for pct in (50, 95, 99)})
+        print(json.dumps(result, indent=2))
+    else:
+        report(result, args.speed)
+
+
+if __name__ == "__main__":
+    main()
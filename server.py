@@ -212,9 +212,27 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import threading
+import base64
+import collections
+import functools
+import gzip
+import atexit
+import heapq
+import hmac
+import io
+import itertools
 import json
 import os
+import re
+import sys
 import time
+from contextlib import contextmanager
+
+# msgpack is optional; without it /messages only accepts JSON bodies
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
 # Try to import Google's genai library, install if not present
 try:
@@ -227,24 +245,203 @@ except ImportError:
     from google import genai
     from google.genai import types
 
+from severity import AlertColumns, SeverityRules
+
 app = Flask(__name__)
 CORS(app)
 
+# Model backend used by run_llm: "gemini" (default), "custom" for the tuned Vertex
+# endpoint, or "stub" for local benchmarking
+LLM_BACKEND = os.environ.get("FLORIAN_LLM_BACKEND", "gemini")
+STUB_LATENCY_MS = float(os.environ.get("FLORIAN_STUB_LATENCY_MS", "0"))
+
+# Local triage in front of the model; enabled by pointing FLORIAN_CASCADE_DATA at
+# the file where past LLM outputs are stored for training
+# (imported only then, since it needs numpy)
+CASCADE_DATA_PATH = os.environ.get("FLORIAN_CASCADE_DATA")
+cascade = None
+if CASCADE_DATA_PATH:
+    from cascade import Cascade
+    cascade = Cascade(
+        CASCADE_DATA_PATH,
+        death_high=float(os.environ.get("FLORIAN_CASCADE_DEATH_HIGH", "0.9")),
+        death_low=float(os.environ.get("FLORIAN_CASCADE_DEATH_LOW", "0.02")),
+        false_alarm_high=float(os.environ.get("FLORIAN_CASCADE_FALSE_ALARM_HIGH", "80")),
+    )
+
+# When set, /messages and /api/alerts traffic is recorded to this file (gzip JSON lines)
+CAPTURE_PATH = os.environ.get("FLORIAN_CAPTURE")
+
+# Description of the fallback answer when the model output cannot be parsed
+LLM_ERROR_DESCRIPTION = "Error processing emergency call. Please review manually."
+
 # Store alerts in memory for this demo
 alerts = []
 
+# Columnar copy of each alert's scores, re-scored in bulk when the severity rules change
+alert_columns = AlertColumns()
+
 # Helper function to generate a unique ID
 def generate_id():
     return f"alert-{int(time.time() * 1000)}"
 
 # Calculate severity based on alert data
 def calculate_severity(data):
-    if data.get("possible_death", 0) > 0:
-        return "high"
-    elif data.get("false_alarm", 100) < 30:
-        return "medium"
-    else:
-        return "low"
+    return alert_columns.rules.severity(data)
+
+######################################
+# Profiling
+######################################
+# Admin endpoints are disabled unless a token is configured
+ADMIN_TOKEN = os.environ.get("FLORIAN_ADMIN_TOKEN")
+SLOW_REQUEST_LIMIT = int(os.environ.get("FLORIAN_SLOW_REQUESTS", "20"))
+
+# The N slowest requests and run_llm jobs, as a min-heap of (total_ms, seq, record)
+slow_requests = []
+slow_requests_lock = threading.Lock()
+slow_request_seq = itertools.count()
+timings_local = threading.local()
+
+def start_timing(kind, name):
+    timings_local.timing = {
+        "kind": kind,
+        "name": name,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "started": time.perf_counter(),
+        "stages": {},
+    }
+
+def finish_timing():
+    timing = getattr(timings_local, "timing", None)
+    if timing is None:
+        return
+    timings_local.timing = None
+
+    total_ms = (time.perf_counter() - timing.pop("started")) * 1000
+    timing["total_ms"] = round(total_ms, 3)
+    timing["stages"] = {name: round(ms, 3) for name, ms in timing["stages"].items()}
+
+    with slow_requests_lock:
+        entry = (total_ms, next(slow_request_seq), timing)
+        if len(slow_requests) < SLOW_REQUEST_LIMIT:
+            heapq.heappush(slow_requests, entry)
+        elif slow_requests and total_ms > slow_requests[0][0]:
+            heapq.heapreplace(slow_requests, entry)
+
+# Time a block as one stage of the current request or run_llm job
+@contextmanager
+def stage(name):
+    timing = getattr(timings_local, "timing", None)
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        timing["stages"][name] = timing["stages"].get(name, 0) + elapsed_ms
+
+# Record a background job (e.g. run_llm) alongside the slow requests
+def timed_job(name):
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            start_timing("job", name)
+            try:
+                return f(*args, **kwargs)
+            finally:
+                finish_timing()
+        return wrapper
+    return decorator
+
+@app.before_request
+def start_request_timing():
+    if not request.path.startswith("/admin/"):
+        start_timing("request", f"{request.method} {request.path}")
+
+@app.teardown_request
+def finish_request_timing(exc):
+    finish_timing()
+
+class SamplingProfiler:
+    """Samples the stacks of every thread from a background thread.
+
+    Nothing runs until start() is called, so an idle profiler costs nothing.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.interval = 0.01
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, interval_ms=10, seconds=None):
+        with self.lock:
+            if self.running:
+                return False
+            self.interval = interval_ms / 1000.0
+            self.stacks = collections.Counter()
+            self.samples = 0
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, args=(seconds,), name="sampling-profiler", daemon=True)
+            self.thread.start()
+            return True
+
+    def stop(self):
+        with self.lock:
+            thread = self.thread
+            self.stop_event.set()
+        if thread is not None:
+            thread.join()
+        return self.collapsed()
+
+    def run(self, seconds):
+        deadline = time.monotonic() + seconds if seconds else None
+        own_ident = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            # Digits are dropped so the stacks of e.g. every run_llm thread merge
+            names = {t.ident: re.sub(r"-\d+", "", t.name) for t in threading.enumerate()}
+            frames = sys._current_frames()
+            with self.lock:
+                for ident, frame in frames.items():
+                    if ident == own_ident:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+                        frame = frame.f_back
+                    stack.append(names.get(ident, f"thread {ident}"))
+                    self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    # Stacks in the collapsed format read by flamegraph.pl and speedscope
+    def collapsed(self):
+        with self.lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+profiler = SamplingProfiler()
+
+def require_admin(f):
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({"success": False, "message": "Not found"}), 404
+        token = request.headers.get("X-Admin-Token", "")
+        if not hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+            return jsonify({"success": False, "message": "Forbidden"}), 403
+        return f(*args, **kwargs)
+    return wrapper
+
 
 ######################################
 # LLM Logic 
@@ -476,48 +673,99 @@ Similarly, it is acceptable if a potential death is flagged but later turns out
     }
   
 
+# Deterministic stand-in for the remote model, used by replay.py benchmarks
+def generate_stub(combined_list):
+    if STUB_LATENCY_MS:
+        time.sleep(STUB_LATENCY_MS / 1000.0)
+
+    text = combined_list.lower()
+    lines = [line for line in combined_list.splitlines() if line.strip()]
+    possible_death = 1 if any(word in text for word in ("dying", "dead", "not breathing", "blood")) else 0
+    false_alarm = 80 if any(word in text for word in ("pocket", "wrong number", "by accident")) else 20
+
+    return {
+        "response": {
+            "possible_death": possible_death,
+            "false_alarm": false_alarm,
+            "location": "Unknown",
+            "description": f"Stub analysis. {lines[-1] if lines else ''}"
+        }
+    }
+
+
+def remote_model(combined_string):
+    if LLM_BACKEND == "stub":
+        return generate_stub(combined_string)
+    if LLM_BACKEND == "custom":
+        return generate_data_custom(combined_string)
+    return generate_data(combined_string)
+
+# Try the local cascade first and only call the remote model when it is unsure
+def analyze_transcript(combined_string):
+    if cascade is not None:
+        with stage("triage"):
+            llm_output = cascade.triage(combined_string)
+        if llm_output is not None:
+            print("🧮 Resolved locally by the cascade")
+            return llm_output
+
+    with stage("model"):
+        started = time.perf_counter()
+        llm_output = remote_model(combined_string)
+        elapsed = time.perf_counter() - started
+
+    response_data = llm_output.get("response", {})
+    # Fallback answers from a parse error would teach the cascade that calls are
+    # false alarms, and stub answers are not model answers at all
+    if cascade is not None and LLM_BACKEND != "stub" and response_data.get("description") != LLM_ERROR_DESCRIPTION:
+        cascade.record(combined_string, response_data, elapsed)
+    return llm_output
+
+@timed_job("run_llm")
 def run_llm(data):
     print("🚀 Starting LLM with data in background")
-    # Filter to user/assistant messages
-    message_data = [item for item in data if item.get('type') in ('user_message', 'assistant_message')]
-    print("🚀 message data:", message_data)
+    with stage("prepare"):
+        # Filter to user/assistant messages
+        message_data = [item for item in data if item.get('type') in ('user_message', 'assistant_message')]
+        print(f"🚀 {len(message_data)} message(s) to analyze")
 
-    # Combine all "content" strings
-    content_data = [msg["message"]["content"] for msg in message_data]
-    combined_string = "\n".join(content_data)
-    print("🚀 combined list:\n", combined_string)
+        # Combine all "content" strings
+        content_data = [msg["message"]["content"] for msg in message_data]
+        combined_string = "\n".join(content_data)
+        print(f"🚀 combined transcript: {len(combined_string)} characters")
 
-    llm_output = generate_data(combined_string)
-    #llm_output = generate_data_custom(combined_string)
+    llm_output = analyze_transcript(combined_string)
 
     print("🚀 LLM output:\n", llm_output)
     
     # Create and add a new alert from the LLM output
     try:
-        # Extract response data
-        response_data = llm_output.get("response", {})
-        
-        # Create a new alert
-        new_alert = {
-            "id": generate_id(),
-            "title": response_data.get("description", "New Alert").split('.')[0] if response_data.get("description") else "New Alert",
-            "message": response_data.get("description", "New alert received"),
-            "severity": calculate_severity(response_data),
-            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-            "recipient": {
-                "id": f"recipient-{int(time.time() * 1000)}",
-                "name": "Emergency Response Team",
-                "isOnline": True
-            },
-            "isRead": False,
-            "possible_death": response_data.get("possible_death", 0),
-            "false_alarm": response_data.get("false_alarm", 50),
-            "location": response_data.get("location", "Unknown"),
-            "description": response_data.get("description", "No description provided")
-        }
-        
-        # Add to our store (at beginning of list)
-        alerts.insert(0, new_alert)
+        with stage("alert"):
+            # Extract response data
+            response_data = llm_output.get("response", {})
+            
+            # Create a new alert
+            new_alert = {
+                "id": generate_id(),
+                "title": response_data.get("description", "New Alert").split('.')[0] if response_data.get("description") else "New Alert",
+                "message": response_data.get("description", "New alert received"),
+                "severity": calculate_severity(response_data),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "recipient": {
+                    "id": f"recipient-{int(time.time() * 1000)}",
+                    "name": "Emergency Response Team",
+                    "isOnline": True
+                },
+                "isRead": False,
+                "possible_death": response_data.get("possible_death", 0),
+                "false_alarm": response_data.get("false_alarm", 50),
+                "location": response_data.get("location", "Unknown"),
+                "description": response_data.get("description", "No description provided")
+            }
+            
+            # Add to our store (at beginning of list)
+            alert_columns.add(new_alert)
+            alerts.insert(0, new_alert)
         print(f"Created new alert: {new_alert['title']}")
         
         return new_alert
@@ -526,21 +774,276 @@ def run_llm(data):
         return None
 
 
+######################################
+# Traffic Capture
+######################################
+CAPTURED_PATHS = ("/messages", "/api/alerts")
+
+capture_lock = threading.Lock()
+capture_file = None
+capture_started = None
+
+# Never overwrite an earlier capture (e.g. after a debug reloader restart); if the
+# path is taken, write next to it with a timestamp in the name instead
+def open_capture_file():
+    try:
+        return CAPTURE_PATH, gzip.open(CAPTURE_PATH, "xt", encoding="utf-8")
+    except FileExistsError:
+        directory, name = os.path.split(CAPTURE_PATH)
+        stem, dot, extension = name.partition(".")
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+        path = os.path.join(directory, f"{stem}-{stamp}-{os.getpid()}{dot}{extension}")
+        return path, gzip.open(path, "xt", encoding="utf-8")
+
+def capture_request():
+    global capture_file, capture_started
+    if not request.path.startswith(CAPTURED_PATHS):
+        return
+
+    body = request.get_data(cache=True)
+    record = {
+        "method": request.method,
+        "path": request.path,
+        "content_type": request.content_type,
+        "content_encoding": request.headers.get("Content-Encoding"),
+    }
+    try:
+        record["body"] = body.decode("utf-8")
+    except UnicodeDecodeError:
+        record["body_b64"] = base64.b64encode(body).decode("ascii")
+
+    with capture_lock:
+        now = time.monotonic()
+        if capture_file is None:
+            path, capture_file = open_capture_file()
+            print(f"📼 Capture file: {path}")
+            capture_started = now
+            atexit.register(capture_file.close)
+            capture_file.write(json.dumps({"version": 1, "started": time.time()}) + "\n")
+        record["t"] = round(now - capture_started, 6)
+        capture_file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        capture_file.flush()
+
+if CAPTURE_PATH:
+    print(f"📼 Capturing /messages and /api/alerts traffic to {CAPTURE_PATH}")
+    app.before_request(capture_request)
+
+
+######################################
+# Message Ingest
+######################################
+# Only these event types reach run_llm; everything else is dropped at the edge
+MESSAGE_TYPES = ('user_message', 'assistant_message')
+MSGPACK_CONTENT_TYPES = ('application/msgpack', 'application/x-msgpack')
+JSON_CHUNK_SIZE = 65536
+
+# Delta sessions: session id -> (last update, message entries received so far),
+# least recently updated first. Idle sessions expire and the oldest are evicted
+# once there are too many.
+SESSION_TTL = float(os.environ.get("FLORIAN_SESSION_TTL", "1800"))
+MAX_SESSIONS = int(os.environ.get("FLORIAN_MAX_SESSIONS", "1000"))
+sessions = collections.OrderedDict()
+sessions_lock = threading.Lock()
+
+class IngestError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+# Other event types are dropped; a message entry run_llm cannot read is rejected
+# so it never reaches a session
+def is_message(item):
+    if not isinstance(item, dict) or item.get('type') not in MESSAGE_TYPES:
+        return False
+    message = item.get('message')
+    if not isinstance(message, dict) or not isinstance(message.get('content'), str):
+        raise IngestError("Each message entry needs a message object with string content")
+    return True
+
+# Characters that can continue a JSON number, e.g. after "1." or "1e"
+NUMBER_TAIL = re.compile(r'[0-9.eE+-]*')
+
+# Yield the elements of a JSON array one at a time. `buf` holds text already
+# read from `text_stream` and starts just after the opening '['.
+def iter_json_array(text_stream, buf):
+    decoder = json.JSONDecoder()
+    pos = 0
+    eof = False
+    first = True
+    expect_value = True
+
+    def read_more():
+        nonlocal buf, pos, eof
+        if eof:
+            raise IngestError("Malformed JSON array")
+        chunk = text_stream.read(JSON_CHUNK_SIZE)
+        eof = not chunk
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    while True:
+        while pos < len(buf) and buf[pos].isspace():
+            pos += 1
+        if pos == len(buf):
+            read_more()
+            continue
+        if buf[pos] == ']' and (first or not expect_value):
+            # Only whitespace may follow the closing bracket
+            rest = buf[pos + 1:]
+            while True:
+                if rest.strip():
+                    raise IngestError("Unexpected data after JSON array")
+                if eof:
+                    return
+                rest = text_stream.read(JSON_CHUNK_SIZE)
+                eof = not rest
+        if not expect_value:
+            if buf[pos] != ',':
+                raise IngestError("Malformed JSON array")
+            pos += 1
+            expect_value = True
+            continue
+
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            read_more()
+            continue
+        # A value touching the end of the buffer may be cut short, so read on;
+        # so may a number followed only by number characters ("1." of "1.5")
+        number = isinstance(item, (int, float)) and not isinstance(item, bool)
+        if not eof and (end == len(buf) or number and NUMBER_TAIL.fullmatch(buf, end)):
+            read_more()
+            continue
+        pos = end
+        first = False
+        expect_value = False
+        yield item
+
+# Returns (session_id, offset, entries) where entries is an iterator
+def parse_json_body(stream):
+    text_stream = io.TextIOWrapper(stream, encoding='utf-8')
+    buf = ''
+    while not buf:
+        chunk = text_stream.read(JSON_CHUNK_SIZE)
+        if not chunk:
+            raise IngestError("Empty request body")
+        buf = chunk.lstrip()
+
+    if buf.startswith('['):
+        # Full messageLog: stream it instead of materializing the whole list
+        return None, None, iter_json_array(text_stream, buf[1:])
+    if buf.startswith('{'):
+        # Delta: small by construction, so parse it in one go
+        try:
+            payload = json.loads(buf + text_stream.read())
+        except json.JSONDecodeError as e:
+            raise IngestError(f"Malformed JSON body: {e}")
+        messages = payload.get('messages') or []
+        if not isinstance(messages, list):
+            raise IngestError("Delta 'messages' must be a list")
+        return payload.get('session_id'), payload.get('offset'), iter(messages)
+    raise IngestError("Expected a JSON array or a delta object")
+
+def parse_msgpack_body(stream):
+    if msgpack is None:
+        raise IngestError("msgpack bodies require the msgpack package", 415)
+
+    unpacker = msgpack.Unpacker(stream, raw=False)
+    try:
+        count = unpacker.read_array_header()
+        return None, None, (unpacker.unpack() for _ in range(count))
+    except ValueError:
+        pass
+
+    session_id, offset, entries = None, None, iter([])
+    try:
+        fields = unpacker.read_map_header()
+    except ValueError:
+        raise IngestError("Expected a msgpack array or a delta map")
+    for _ in range(fields):
+        key = unpacker.unpack()
+        if key == 'messages':
+            count = unpacker.read_array_header()
+            # Filtered here because the remaining fields must still be read
+            entries = iter([item for item in (unpacker.unpack() for _ in range(count)) if is_message(item)])
+        elif key == 'session_id':
+            session_id = unpacker.unpack()
+        elif key == 'offset':
+            offset = unpacker.unpack()
+        else:
+            unpacker.skip()
+    return session_id, offset, entries
+
+def parse_messages_request():
+    # Capture mode has already buffered the body, so the raw stream is empty
+    stream = io.BytesIO(request.get_data(cache=True)) if CAPTURE_PATH else request.stream
+
+    encoding = (request.headers.get('Content-Encoding') or 'identity').lower()
+    if encoding == 'gzip':
+        stream = gzip.GzipFile(fileobj=stream)
+    elif encoding != 'identity':
+        raise IngestError(f"Unsupported Content-Encoding: {encoding}", 415)
+
+    try:
+        if request.mimetype in MSGPACK_CONTENT_TYPES:
+            session_id, offset, entries = parse_msgpack_body(stream)
+        else:
+            session_id, offset, entries = parse_json_body(stream)
+        messages = [item for item in entries if is_message(item)]
+    except IngestError:
+        raise
+    except Exception as e:
+        # Corrupt gzip, msgpack or UTF-8 data surfaces while the body is read
+        raise IngestError(f"Malformed request body: {str(e)}")
+    return session_id, offset, messages
+
+# Append a delta to its session and return the full message list for run_llm
+def apply_delta(session_id, offset, messages):
+    if isinstance(session_id, bool) or not isinstance(session_id, (str, int)):
+        raise IngestError("session_id must be a string or an integer")
+    if offset is not None and (isinstance(offset, bool) or not isinstance(offset, int) or offset < 0):
+        raise IngestError("offset must be a non-negative integer")
+
+    with sessions_lock:
+        now = time.monotonic()
+        last_update, session = sessions.get(session_id, (now, []))
+        if now - last_update > SESSION_TTL:
+            # Expired but not evicted yet; the client resends from offset 0
+            session = []
+        if offset is not None and offset != len(session):
+            raise IngestError(f"Delta offset {offset} does not match session length {len(session)}", 409)
+        session.extend(messages)
+        sessions.pop(session_id, None)
+        sessions[session_id] = (now, session)
+
+        while sessions:
+            oldest_id, (last_update, _) = next(iter(sessions.items()))
+            if len(sessions) <= MAX_SESSIONS and now - last_update <= SESSION_TTL:
+                break
+            del sessions[oldest_id]
+        return list(session)
+
+
 ######################################
 # Flask Routes
 ######################################
 
 @app.route('/api/alerts', methods=['GET'])
 def get_alerts():
-    return jsonify(alerts)
+    # Optional ?limit=N returns only the N newest alerts
+    limit = request.args.get("limit", type=int)
+    with stage("serialize"):
+        return jsonify(alerts[:limit] if limit is not None and limit >= 0 else alerts)
 
 @app.route('/api/alerts', methods=['POST'])
 def add_alert():
     try:
         # Get data from request
-        data = request.json.get('response', None)
-        if data is None:
-            data = request.json
+        with stage("parse"):
+            data = request.json.get('response', None)
+            if data is None:
+                data = request.json
         
         # Calculate severity
         severity = calculate_severity(data)
@@ -565,7 +1068,9 @@ def add_alert():
         }
         
         # Add to our store (at beginning of list)
-        alerts.insert(0, new_alert)
+        with stage("store"):
+            alert_columns.add(new_alert)
+            alerts.insert(0, new_alert)
         
         return jsonify({
             "success": True,
@@ -584,6 +1089,9 @@ def add_alert():
 def delete_alert(alert_id):
     global alerts
     initial_length = len(alerts)
+    for alert in alerts:
+        if alert["id"] == alert_id:
+            alert_columns.remove(alert)
     alerts = [alert for alert in alerts if alert["id"] != alert_id]
     
     if len(alerts) < initial_length:
@@ -597,17 +1105,101 @@ def delete_alert(alert_id):
             "message": "Alert not found"
         }), 404
 
+@app.route('/api/severity-rules', methods=['GET'])
+def get_severity_rules():
+    rules = alert_columns.rules.to_json()
+    rules["version"] = alert_columns.version
+    return jsonify(rules)
+
+@app.route('/api/severity-rules', methods=['PUT'])
+@require_admin
+def set_severity_rules():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"success": False, "message": "Invalid severity rules: body must be a JSON object"}), 400
+    try:
+        rules = SeverityRules(data.get("rules"), data.get("default", "low"))
+    except ValueError as e:
+        return jsonify({"success": False, "message": f"Invalid severity rules: {str(e)}"}), 400
+
+    with stage("rescore"):
+        changes = alert_columns.set_rules(rules)
+    print(f"Severity rules updated, {changes['count']} alert(s) re-scored")
+    return jsonify({
+        "success": True,
+        "message": "Severity rules updated",
+        "rules": rules.to_json(),
+        "changes": changes
+    })
+
 @app.route("/messages", methods=["POST"])
 def messages():
-    data = request.json
-    print("📥 Received messageLog from frontend:", data)
+    try:
+        with stage("parse"):
+            session_id, offset, data = parse_messages_request()
+        if session_id is not None:
+            received = len(data)
+            with stage("session"):
+                data = apply_delta(session_id, offset, data)
+            print(f"📥 Received {received} new message(s) for session {session_id} ({len(data)} total)")
+        else:
+            print(f"📥 Received messageLog from frontend with {len(data)} message(s)")
+    except IngestError as e:
+        print(f"Error reading messages: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)}), e.status
 
     # Spawn a new thread to handle data in the background
-    thread = threading.Thread(target=run_llm, args=(data,))
-    thread.start()
+    with stage("dispatch"):
+        thread = threading.Thread(target=run_llm, args=(data,))
+        thread.start()
 
     return jsonify({"status": "ok", "message_count": len(data)})
 
+@app.route('/admin/profile/start', methods=['POST'])
+@require_admin
+def start_profile():
+    try:
+        interval_ms = float(request.args.get("interval_ms", 10))
+        seconds = float(request.args["seconds"]) if "seconds" in request.args else None
+    except ValueError:
+        return jsonify({"success": False, "message": "interval_ms and seconds must be numbers"}), 400
+    if not 1 <= interval_ms <= 1000:
+        return jsonify({"success": False, "message": "interval_ms must be between 1 and 1000"}), 400
+    if seconds is not None and not 0 < seconds <= 3600:
+        return jsonify({"success": False, "message": "seconds must be between 0 and 3600"}), 400
+
+    if not profiler.start(interval_ms, seconds):
+        return jsonify({"success": False, "message": "Profiler is already running"}), 409
+    return jsonify({"success": True, "message": "Profiler started", "interval_ms": interval_ms})
+
+@app.route('/admin/profile/stop', methods=['POST'])
+@require_admin
+def stop_profile():
+    return profiler.stop(), 200, {"Content-Type": "text/plain; charset=utf-8"}
+
+@app.route('/admin/profile', methods=['GET'])
+@require_admin
+def get_profile():
+    return profiler.collapsed(), 200, {
+        "Content-Type": "text/plain; charset=utf-8",
+        "X-Profiler-Running": str(profiler.running).lower(),
+        "X-Profiler-Samples": str(profiler.samples),
+    }
+
+@app.route('/admin/cascade', methods=['GET'])
+@require_admin
+def get_cascade_stats():
+    if cascade is None:
+        return jsonify({"success": False, "message": "Cascade is disabled"}), 404
+    return jsonify(cascade.stats())
+
+@app.route('/admin/slow-requests', methods=['GET'])
+@require_admin
+def get_slow_requests():
+    with slow_requests_lock:
+        slowest = sorted(slow_requests, reverse=True)
+    return jsonify([record for _, _, record in slowest])
+
 if __name__ == '__main__':
     print("Python API server running at http://localhost:5000")
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
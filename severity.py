@@ -0,0 +1,188 @@
+"""Configurable severity rules evaluated over a columnar view of the alert store.
+
+Rules are checked in order and the first match decides an alert's severity;
+alerts matching no rule get the default. The defaults reproduce the original
+thresholds: possible_death > 0 is high, false_alarm < 30 is medium, else low.
+Whatever the rules say, an alert with possible_death > 0 is always high, in
+line with the system prompt's rule never to downgrade a potential death.
+
+AlertColumns keeps possible_death, false_alarm and the severity of every
+stored alert in NumPy arrays, so changing the rules re-scores the whole store
+with a handful of vectorized comparisons.
+"""
+import math
+import operator
+import threading
+
+import numpy as np
+
+SEVERITIES = ("low", "medium", "high")
+SEVERITY_CODES = {severity: code for code, severity in enumerate(SEVERITIES)}
+
+# Missing scores fall back to the values the original if/elif assumed
+FIELD_DEFAULTS = {"possible_death": 0.0, "false_alarm": 100.0}
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+}
+
+DEFAULT_RULES = [
+    {"field": "possible_death", "op": ">", "value": 0, "severity": "high"},
+    {"field": "false_alarm", "op": "<", "value": 30, "severity": "medium"},
+]
+
+
+# Membership tests on a dict would raise TypeError for lists or dicts from a JSON body
+def is_one_of(value, choices):
+    return isinstance(value, str) and value in choices
+
+
+def score_value(data, field):
+    value = data.get(field)
+    try:
+        return float(value) if value is not None else FIELD_DEFAULTS[field]
+    except (TypeError, ValueError):
+        return FIELD_DEFAULTS[field]
+
+
+class SeverityRules:
+    """An ordered, validated list of rules compiled for array evaluation."""
+
+    def __init__(self, rules=None, default="low"):
+        rules = DEFAULT_RULES if rules is None else rules
+        if not isinstance(rules, list):
+            raise ValueError("rules must be a list")
+        if not is_one_of(default, SEVERITY_CODES):
+            raise ValueError(f"default must be one of {', '.join(SEVERITIES)}")
+
+        self.rules = []
+        self.compiled = []
+        for rule in rules:
+            if not isinstance(rule, dict):
+                raise ValueError("each rule must be an object")
+            field, op, severity = rule.get("field"), rule.get("op"), rule.get("severity")
+            if not is_one_of(field, FIELD_DEFAULTS):
+                raise ValueError(f"field must be one of {', '.join(FIELD_DEFAULTS)}")
+            if not is_one_of(op, OPERATORS):
+                raise ValueError(f"op must be one of {', '.join(OPERATORS)}")
+            if not is_one_of(severity, SEVERITY_CODES):
+                raise ValueError(f"severity must be one of {', '.join(SEVERITIES)}")
+            try:
+                value = float(rule.get("value"))
+            except (TypeError, ValueError):
+                raise ValueError("value must be a number")
+            if not math.isfinite(value):
+                raise ValueError("value must be a finite number")
+            self.rules.append({"field": field, "op": op, "value": value, "severity": severity})
+            self.compiled.append((field, OPERATORS[op], value, SEVERITY_CODES[severity]))
+        self.default = default
+        self.default_code = SEVERITY_CODES[default]
+
+    def evaluate(self, columns):
+        """Return severity codes (int8) for a dict of equally sized field arrays."""
+        n = len(next(iter(columns.values())))
+        codes = np.full(n, self.default_code, dtype=np.int8)
+        # Apply the last rule first so earlier rules overwrite later ones
+        for field, op, value, code in reversed(self.compiled):
+            codes[op(columns[field], value)] = code
+        codes[columns["possible_death"] > 0] = SEVERITY_CODES["high"]
+        return codes
+
+    def severity(self, data):
+        columns = {field: np.array([score_value(data, field)]) for field in FIELD_DEFAULTS}
+        return SEVERITIES[self.evaluate(columns)[0]]
+
+    def to_json(self):
+        return {"rules": self.rules, "default": self.default}
+
+
+class AlertColumns:
+    """Score columns for the alert store, one row per alert in insertion order."""
+
+    def __init__(self, rules=None, capacity=1024):
+        self.lock = threading.Lock()
+        self.rules = rules or SeverityRules()
+        self.version = 0
+        self.size = 0
+        self.deleted = 0
+        self.alerts = []
+        self.rows = {}
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        columns = {field: np.empty(capacity, dtype=np.float64) for field in FIELD_DEFAULTS}
+        codes = np.empty(capacity, dtype=np.int8)
+        alive = np.zeros(capacity, dtype=bool)
+        if self.size:
+            for field, column in columns.items():
+                column[:self.size] = self.columns[field][:self.size]
+            codes[:self.size] = self.codes[:self.size]
+            alive[:self.size] = self.alive[:self.size]
+        self.columns, self.codes, self.alive = columns, codes, alive
+
+    def add(self, alert):
+        """Add an alert and set its severity with the current rules."""
+        with self.lock:
+            if self.size == len(self.codes):
+                self.allocate(2 * len(self.codes))
+            row = self.size
+            for field, column in self.columns.items():
+                column[row] = score_value(alert, field)
+            code = self.rules.evaluate({field: column[row:row + 1] for field, column in self.columns.items()})[0]
+            self.codes[row] = code
+            self.alive[row] = True
+            self.alerts.append(alert)
+            self.rows[id(alert)] = row
+            self.size += 1
+            alert["severity"] = SEVERITIES[code]
+
+    def remove(self, alert):
+        with self.lock:
+            row = self.rows.pop(id(alert), None)
+            if row is None:
+                return
+            self.alive[row] = False
+            self.alerts[row] = None
+            self.deleted += 1
+            if self.deleted > 1024 and self.deleted * 2 > self.size:
+                self.compact()
+
+    def compact(self):
+        keep = np.flatnonzero(self.alive[:self.size])
+        for field, column in self.columns.items():
+            column[:len(keep)] = column[keep]
+        self.codes[:len(keep)] = self.codes[keep]
+        self.alive[:len(keep)] = True
+        self.alive[len(keep):self.size] = False
+        self.alerts = [self.alerts[row] for row in keep]
+        self.rows = {id(alert): row for row, alert in enumerate(self.alerts)}
+        self.size = len(keep)
+        self.deleted = 0
+
+    def set_rules(self, rules):
+        """Re-score every alert with new rules and return the batched change-set."""
+        with self.lock:
+            n = self.size
+            codes = rules.evaluate({field: column[:n] for field, column in self.columns.items()})
+            changed = np.flatnonzero((codes != self.codes[:n]) & self.alive[:n])
+            previous = self.codes[changed]
+            self.codes[:n] = codes
+            self.rules = rules
+            self.version += 1
+
+            ids = []
+            for row in changed.tolist():
+                alert = self.alerts[row]
+                alert["severity"] = SEVERITIES[codes[row]]
+                ids.append(alert["id"])
+            return {
+                "version": self.version,
+                "count": len(ids),
+                "ids": ids,
+                "severity": [SEVERITIES[code] for code in codes[changed].tolist()],
+                "previous": [SEVERITIES[code] for code in previous.tolist()],
+            }
@@ -0,0 +1,73 @@
+import pytest
+
+import replay
+import server
+from cascade import Cascade, mentions_death_risk
+
+
+class ConfidentBenignModel:
+    """Stands in for a trained model that is sure every call is a false alarm."""
+
+    def predict(self, indices, values):
+        return 0.0, 99.0
+
+
+@pytest.fixture
+def cascade(tmp_path):
+    cascade = Cascade(str(tmp_path / "llm_outputs.jsonl"))
+    cascade.model = ConfidentBenignModel()
+    return cascade
+
+
+@pytest.mark.parametrize("phrase", [
+    "she died",
+    "he got stabbed",
+    "he can't breathe",
+    "my son overdosed",
+    "he collapsed",
+    "there was a shooting",
+    "he killed her",
+    "she won't wake up",
+    "he is hanging from the ceiling",
+])
+def test_death_risk_phrases_escalate(cascade, phrase):
+    assert mentions_death_risk(phrase)
+    assert cascade.triage(f"hello\nsorry\n{phrase}") is None
+
+
+def test_plain_pocket_dial_is_resolved_locally(cascade):
+    result = cascade.triage("hello\nsorry wrong number, I'll hang up now")
+    assert result["response"]["possible_death"] == 0
+
+
+class RecordingCascade:
+    """Never answers locally and keeps every remote answer it is asked to store."""
+
+    def __init__(self):
+        self.recorded = []
+
+    def triage(self, transcript):
+        return None
+
+    def record(self, transcript, response, remote_seconds):
+        self.recorded.append(transcript)
+
+
+def test_stub_answers_are_not_recorded(monkeypatch):
+    recording = RecordingCascade()
+    monkeypatch.setattr(server, "cascade", recording)
+    monkeypatch.setattr(server, "LLM_BACKEND", "stub")
+
+    assert server.analyze_transcript("hello\nhelp")["response"]["description"]
+    assert recording.recorded == []
+
+
+def test_replay_server_does_not_train_the_cascade(monkeypatch):
+    monkeypatch.setenv("FLORIAN_CASCADE_DATA", "llm_outputs.jsonl")
+    monkeypatch.setenv("FLORIAN_CAPTURE", "capture.jsonl.gz")
+
+    env = replay.stub_server_env(0)
+
+    assert env["FLORIAN_LLM_BACKEND"] == "stub"
+    assert "FLORIAN_CASCADE_DATA" not in env
+    assert "FLORIAN_CAPTURE" not in env
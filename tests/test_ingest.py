@@ -0,0 +1,85 @@
+import gzip
+import io
+import json
+
+import pytest
+
+import server
+
+
+def message(content):
+    return {"type": "user_message", "message": {"role": "user", "content": content}}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    dispatched = []
+    monkeypatch.setattr(server, "run_llm", dispatched.append)
+    monkeypatch.setattr(server, "sessions", server.sessions.__class__())
+    client = server.app.test_client()
+    client.dispatched = dispatched
+    return client
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3])
+@pytest.mark.parametrize("text", [
+    '[1.5, 2]',
+    '[1e5, 2]',
+    '[-12.25e-3, true, null, "a,]b", {"k": [1, 2]}]',
+    '[ ]',
+])
+def test_array_split_at_any_chunk_boundary(monkeypatch, chunk_size, text):
+    monkeypatch.setattr(server, "JSON_CHUNK_SIZE", chunk_size)
+    stream = io.StringIO(text)
+    buf = stream.read(1)
+    assert buf == "["
+    assert list(server.iter_json_array(stream, "")) == json.loads(text)
+
+
+@pytest.mark.parametrize("text", ['[1, 2] x', '[1, 2]]', '[1 2]', '[1.]'])
+def test_malformed_array_is_rejected(monkeypatch, text):
+    monkeypatch.setattr(server, "JSON_CHUNK_SIZE", 1)
+    stream = io.StringIO(text)
+    stream.read(1)
+    with pytest.raises(server.IngestError):
+        list(server.iter_json_array(stream, ""))
+
+
+def test_gzip_body(client):
+    body = gzip.compress(json.dumps([message("help"), {"type": "call_started"}]).encode("utf-8"))
+    response = client.post("/messages", data=body,
+                           headers={"Content-Type": "application/json", "Content-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert client.dispatched == [[message("help")]]
+
+
+def test_msgpack_delta_body(client):
+    msgpack = pytest.importorskip("msgpack")
+    body = msgpack.packb({"session_id": "call-1", "offset": 0, "messages": [message("help")]})
+    response = client.post("/messages", data=body, headers={"Content-Type": "application/msgpack"})
+    assert response.status_code == 200
+    assert client.dispatched == [[message("help")]]
+
+
+def test_delta_offset_mismatch_is_409(client):
+    assert client.post("/messages", json={"session_id": "call-1", "messages": [message("a")]}).status_code == 200
+    response = client.post("/messages", json={"session_id": "call-1", "offset": 0, "messages": [message("b")]})
+    assert response.status_code == 409
+    assert len(client.dispatched) == 1
+
+
+def test_trailing_data_is_400(client):
+    response = client.post("/messages", data='[] {"extra": 1}', headers={"Content-Type": "application/json"})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("entry", [
+    {"type": "user_message"},
+    {"type": "user_message", "message": "help"},
+    {"type": "assistant_message", "message": {"role": "assistant", "content": ["help"]}},
+])
+def test_malformed_message_is_400(client, entry):
+    response = client.post("/messages", json={"session_id": "call-1", "messages": [entry]})
+    assert response.status_code == 400
+    assert "call-1" not in server.sessions
+    assert client.dispatched == []
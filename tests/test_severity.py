@@ -0,0 +1,55 @@
+import pytest
+
+import server
+from severity import AlertColumns, SeverityRules
+
+
+def test_possible_death_is_always_high():
+    columns = AlertColumns()
+    alert = {"id": "alert-1", "possible_death": 1, "false_alarm": 90}
+    columns.add(alert)
+
+    changes = columns.set_rules(SeverityRules([], default="low"))
+
+    assert alert["severity"] == "high"
+    assert changes["count"] == 0
+
+
+def test_rescore_emits_one_change_set():
+    columns = AlertColumns()
+    alerts = [{"id": f"alert-{i}", "possible_death": 0, "false_alarm": fa} for i, fa in enumerate((10, 40, 90))]
+    for alert in alerts:
+        columns.add(alert)
+
+    changes = columns.set_rules(SeverityRules([{"field": "false_alarm", "op": "<", "value": 50, "severity": "medium"}]))
+
+    assert changes["ids"] == ["alert-1"]
+    assert changes["severity"] == ["medium"]
+    assert changes["previous"] == ["low"]
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", "-inf", None, "x"])
+def test_non_finite_thresholds_are_rejected(value):
+    with pytest.raises(ValueError):
+        SeverityRules([{"field": "false_alarm", "op": "<", "value": value, "severity": "medium"}])
+
+
+UNHASHABLE_BODIES = [
+    {"default": []},
+    {"rules": [{"field": ["x"], "op": "<", "value": 30, "severity": "medium"}]},
+    {"rules": [{"field": "false_alarm", "op": {}, "value": 30, "severity": "medium"}]},
+    {"rules": [{"field": "false_alarm", "op": "<", "value": 30, "severity": ["high"]}]},
+]
+
+
+@pytest.mark.parametrize("body", UNHASHABLE_BODIES)
+def test_unhashable_rule_values_are_rejected(body):
+    with pytest.raises(ValueError):
+        SeverityRules(body.get("rules"), body.get("default", "low"))
+
+
+@pytest.mark.parametrize("body", UNHASHABLE_BODIES)
+def test_unhashable_rule_values_are_400(monkeypatch, body):
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "secret")
+    response = server.app.test_client().put("/api/severity-rules", json=body, headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 400